@@ -1,6 +1,7 @@
 # This file is used for LoRa and Raspberry pi4B related issues
 import RPi.GPIO as GPIO
 import serial
+import select
 import time
 
 class sx126x:
@@ -74,12 +75,43 @@ class sx126x:
         32:SX126X_PACKAGE_SIZE_32_BYTE
     }
     
+    # REG3 bit 3 selects the WOR role, bits 2..0 the WOR cycle (500ms * (n+1))
+    SX126X_WOR_RECEIVER = 0x00
+    SX126X_WOR_TRANSMITTER = 0x08
+    
+    lora_wor_period_dic = {
+        500:0x00,
+        1000:0x01,
+        1500:0x02,
+        2000:0x03,
+        2500:0x04,
+        3000:0x05,
+        3500:0x06,
+        4000:0x07
+    }
+    
+    # WOR state, filled in by set()
+    wor = False
+    wor_tx = False
+    wor_period = 2000
+    air_speed = 2400
+    verbose = False
+    
+    # rough figures for the E22 module used by wor_stats(), tune them
+    # against measurements of the actual node
+    supply_voltage = 5.0      # V
+    rx_current = 0.014        # A, radio listening/receiving
+    sleep_current = 0.000005  # A, radio asleep between WOR wake-ups
+    wor_rx_window = 0.010     # s, time the radio listens for a preamble per cycle
+    
     def __init__(self,serial_num,freq,addr,power,rssi,air_speed=2400,\
                  net_id=0,buffer_size = 240,crypt=0,\
-                 relay=False,lbt=False,wor=False):
+                 relay=False,lbt=False,wor=False,wor_period=2000,wor_tx=False,\
+                 verbose=False):
         print("[DEBUG] Initializing LoRa module")
         print(f"[DEBUG] Parameters: serial={serial_num}, freq={freq}, addr={addr}, power={power}, rssi={rssi}, air_speed={air_speed}")
         
+        self.verbose = verbose
         self.rssi = rssi
         self.addr = addr
         self.freq = freq
@@ -107,16 +139,29 @@ class sx126x:
             
         self.ser.flushInput()
         print("[DEBUG] Calling set() method to configure module")
-        self.set(freq,addr,power,rssi,air_speed,net_id,buffer_size,crypt,relay,lbt,wor)
+        self.set(freq,addr,power,rssi,air_speed,net_id,buffer_size,crypt,relay,lbt,wor,wor_period,wor_tx)
     
+    # wor=True keeps the module in WOR receive mode while idle, it wakes up every
+    # wor_period ms to listen for a preamble. wor_tx=True configures the module as
+    # WOR transmitter, so send() prefixes every packet with a wake-up preamble.
     def set(self,freq,addr,power,rssi,air_speed=2400,\
             net_id=0,buffer_size = 240,crypt=0,\
-            relay=False,lbt=False,wor=False):
+            relay=False,lbt=False,wor=False,wor_period=2000,wor_tx=False):
             
         print(f"[DEBUG] Setting module parameters: freq={freq}, addr={addr}, power={power}, air_speed={air_speed}")
         
+        if wor and wor_tx:
+            raise ValueError("wor and wor_tx are exclusive, a node is either WOR receiver or transmitter")
+        wor_period_temp = self.lora_wor_period_dic.get(wor_period,None)
+        if wor_period_temp is None:
+            raise ValueError(f"Unsupported WOR period {wor_period}ms, use one of {sorted(self.lora_wor_period_dic)}")
+        
         self.send_to = addr
         self.addr = addr
+        self.air_speed = air_speed
+        self.wor = wor
+        self.wor_tx = wor_tx
+        self.wor_period = wor_period
         
         # We should pull up the M1 pin when sets the module
         print("[DEBUG] Setting M0=LOW, M1=HIGH for configuration mode")
@@ -163,6 +208,12 @@ class sx126x:
         l_crypt = crypt & 0xff
         h_crypt = crypt >> 8 & 0xff
         
+        if wor_tx:
+            wor_temp = self.SX126X_WOR_TRANSMITTER + wor_period_temp
+        else:
+            wor_temp = self.SX126X_WOR_RECEIVER + wor_period_temp
+        print(f"[DEBUG] WOR setting: wor={wor}, wor_tx={wor_tx}, period={wor_period}ms => {hex(wor_temp)}")
+        
         if relay==False:
             print("[DEBUG] Regular mode (not relay)")
             self.cfg_reg[3] = high_addr
@@ -171,7 +222,7 @@ class sx126x:
             self.cfg_reg[6] = self.SX126X_UART_BAUDRATE_9600 + air_speed_temp
             self.cfg_reg[7] = buffer_size_temp + power_temp + 0x20
             self.cfg_reg[8] = freq_temp
-            self.cfg_reg[9] = 0x43 + rssi_temp
+            self.cfg_reg[9] = 0x40 + wor_temp + rssi_temp
             self.cfg_reg[10] = h_crypt
             self.cfg_reg[11] = l_crypt
         else:
@@ -182,7 +233,7 @@ class sx126x:
             self.cfg_reg[6] = self.SX126X_UART_BAUDRATE_9600 + air_speed_temp
             self.cfg_reg[7] = buffer_size_temp + power_temp + 0x20
             self.cfg_reg[8] = freq_temp
-            self.cfg_reg[9] = 0x03 + rssi_temp
+            self.cfg_reg[9] = 0x00 + wor_temp + rssi_temp
             self.cfg_reg[10] = h_crypt
             self.cfg_reg[11] = l_crypt
             
@@ -234,14 +285,81 @@ class sx126x:
                 print("[DEBUG] ERROR: Both configuration attempts failed")
                 print("setting fail,Press Esc to Exit and run again")
         
-        print("[DEBUG] Setting M0=LOW, M1=LOW for normal operation mode")
-        GPIO.output(self.M0,GPIO.LOW)
-        GPIO.output(self.M1,GPIO.LOW)
+        self.idle()
+    
+    # put the module back into its idle mode, WOR receive mode for WOR
+    # receivers and normal mode otherwise
+    def idle(self):
+        if self.wor:
+            print("[DEBUG] Setting M0=HIGH, M1=LOW for WOR mode")
+            GPIO.output(self.M0,GPIO.HIGH)
+            GPIO.output(self.M1,GPIO.LOW)
+        else:
+            print("[DEBUG] Setting M0=LOW, M1=LOW for normal operation mode")
+            GPIO.output(self.M0,GPIO.LOW)
+            GPIO.output(self.M1,GPIO.LOW)
+        time.sleep(0.1)
+    
+    # deep sleep, the module neither sends nor receives until idle() or set()
+    def sleep(self):
+        print("[DEBUG] Setting M0=HIGH, M1=HIGH for sleep mode")
+        GPIO.output(self.M0,GPIO.HIGH)
+        GPIO.output(self.M1,GPIO.HIGH)
         time.sleep(0.1)
     
+    # seconds a packet of length bytes (header included) is on air
+    def air_time(self,length):
+        return length * 8 / self.air_speed
+    
+    # estimate the latency-vs-power tradeoff of the current settings for a
+    # packet of payload_len bytes (the 3 byte header is added here).
+    # energy_per_packet_mJ only covers receiving the packet itself, give
+    # packet_interval (seconds between packets) to also get the idle listening
+    # energy spent per packet as idle_energy_per_packet_mJ. The wake-up
+    # preamble is as long as the sender's WOR period, give tx_wor_period (ms)
+    # when the sender uses a longer period than this node.
+    def wor_stats(self,payload_len=16,packet_interval=None,tx_wor_period=None):
+        air_time = self.air_time(payload_len + 3)
+        if tx_wor_period is None:
+            tx_wor_period = self.wor_period
+        
+        if self.wor:
+            period = self.wor_period / 1000
+            # the radio listens for wor_rx_window every period and sleeps otherwise
+            duty_cycle = min(self.wor_rx_window / period, 1.0)
+            # the wake-up preamble lasts one sender period, so a packet reaches the
+            # host that long plus its air time after it was sent. The receiver wakes
+            # at a uniformly random point within its last period of the preamble and
+            # stays awake for the rest of it, on average period / 2 plus the part
+            # of the preamble that is longer than this node's period.
+            preamble = tx_wor_period / 1000
+            wake_latency = preamble + air_time
+            rx_time = preamble - period / 2 + air_time
+        else:
+            # normal mode, the radio listens all the time
+            duty_cycle = 1.0
+            wake_latency = air_time
+            rx_time = air_time
+        
+        idle_power = self.supply_voltage * (self.rx_current * duty_cycle + self.sleep_current * (1 - duty_cycle))
+        energy_per_packet = self.supply_voltage * self.rx_current * rx_time
+        
+        stats = {
+            "duty_cycle":duty_cycle,
+            "wake_latency_s":wake_latency,
+            "idle_power_mW":idle_power * 1000,
+            "energy_per_packet_mJ":energy_per_packet * 1000
+        }
+        if packet_interval is not None:
+            stats["idle_energy_per_packet_mJ"] = idle_power * packet_interval * 1000
+        print("[DEBUG] wor_stats: wor={0}, period={1}ms, duty cycle={2:.2%}, wake latency={3:.3f}s, idle power={4:.3f}mW, energy/packet={5:.3f}mJ".format(
+            self.wor,self.wor_period,duty_cycle,wake_latency,stats["idle_power_mW"],stats["energy_per_packet_mJ"]))
+        return stats
+    
     def get_settings(self):
         # the pin M1 of lora HAT must be high when enter setting mode and get parameters
-        print("[DEBUG] get_settings: Setting M1=HIGH for configuration mode")
+        print("[DEBUG] get_settings: Setting M0=LOW, M1=HIGH for configuration mode")
+        GPIO.output(self.M0,GPIO.LOW)
         GPIO.output(self.M1,GPIO.HIGH)
         time.sleep(0.1)
         
@@ -277,16 +395,25 @@ class sx126x:
         else:
             print("[DEBUG] get_settings: No response received")
             
-        print("[DEBUG] get_settings: Setting M1=LOW for normal mode")
-        GPIO.output(self.M1,GPIO.LOW)
+        self.idle()
     
     # the data format like as following
     # "node address,frequence,payload"
     # "20,868,Hello World"
-    def send(self,data):
-        print("[DEBUG] send: Setting M0=LOW, M1=LOW for transmission mode")
-        GPIO.output(self.M1,GPIO.LOW)
-        GPIO.output(self.M0,GPIO.LOW)
+    # wake=True sends a wake-up preamble first, it defaults to the wor_tx setting
+    def send(self,data,wake=None):
+        if wake is None:
+            wake = self.wor_tx
+        if wake:
+            if not self.wor_tx:
+                raise ValueError("wake-up preambles need the module configured with wor_tx=True")
+            print("[DEBUG] send: Setting M0=HIGH, M1=LOW for WOR transmission mode")
+            GPIO.output(self.M1,GPIO.LOW)
+            GPIO.output(self.M0,GPIO.HIGH)
+        else:
+            print("[DEBUG] send: Setting M0=LOW, M1=LOW for transmission mode")
+            GPIO.output(self.M1,GPIO.LOW)
+            GPIO.output(self.M0,GPIO.LOW)
         time.sleep(0.1)
         
         print(f"[DEBUG] send: Sending data, length={len(data)}")
@@ -297,8 +424,28 @@ class sx126x:
             print(f"[DEBUG] ERROR: Failed to write to serial: {str(e)}")
             
         time.sleep(0.1)
+        # wait until the packet (and the one WOR period long preamble in front
+        # of it) is out before switching back to the idle mode
+        self.ser.flush()
+        tx_time = self.air_time(len(data))
+        if wake:
+            tx_time += self.wor_period / 1000
+        time.sleep(tx_time + 0.1)
+        self.idle()
+    
+    # block until the module has sent something over the UART, timeout in
+    # seconds, None waits forever and 0 only checks
+    def wait_for_data(self,timeout=None):
+        if self.ser.inWaiting() > 0:
+            return True
+        readable,_,_ = select.select([self.ser],[],[],timeout)
+        return len(readable) > 0
         
-    def receive(self):
+    # the default timeout=0 polls, pass a timeout (or None) to block until a
+    # packet arrives instead of polling inWaiting() from the caller
+    def receive(self,timeout=0):
+        if not self.wait_for_data(timeout):
+            return None, None
         if self.ser.inWaiting() > 0:
             print(f"[DEBUG] receive: Data available, bytes={self.ser.inWaiting()}")
             time.sleep(0.5)
@@ -307,7 +454,7 @@ class sx126x:
                 print(f"[DEBUG] receive: Read {len(r_buff)} bytes")
             except Exception as e:
                 print(f"[DEBUG] ERROR: Failed to read from serial: {str(e)}")
-                return
+                return None, None
  
 # --- Start Replacement ---
             payload = None
@@ -359,6 +506,8 @@ class sx126x:
                 self.get_channel_rssi()
             else:
                 pass
+        
+        return None, None
     
     def get_channel_rssi(self):
         print("[DEBUG] get_channel_rssi: Setting M0=LOW, M1=LOW for normal mode")
@@ -395,4 +544,6 @@ class sx126x:
                 print("[DEBUG] get_channel_rssi: Invalid RSSI response format")
                 print("receive rssi value fail")
         else:
-            print("[DEBUG] get_channel_rssi: No response received")
\ No newline at end of file
+            print("[DEBUG] get_channel_rssi: No response received")
+            
+        self.idle()
\ No newline at end of file
@@ -36,6 +36,8 @@ LORA_FREQUENCY = 915
 LORA_POWER = 22 # Required for init
 LORA_AIR_SPEED = 2400
 RX_NODE_ADDRESS = 1 # This node's address
+LORA_WOR = True # Idle in wake-on-radio mode, the transmitter must use wor_tx
+LORA_WOR_PERIOD = 2000 # ms, the transmitter's period must be at least the receiver's
 
 # --- LCD Configuration & Layout (Same as previous) ---
 LCD_RST_PIN = 27; LCD_DC_PIN = 25; LCD_BL_PIN = 18
@@ -65,8 +67,10 @@ def initialize_lora():
         # Use modified sx126x (lora_driver), enable RSSI
         node = sx126x.sx126x(
             serial_num=LORA_SERIAL_PORT, freq=LORA_FREQUENCY, addr=RX_NODE_ADDRESS,
-            power=LORA_POWER, rssi=True, air_speed=LORA_AIR_SPEED, verbose=False # Use verbose=True to debug init
+            power=LORA_POWER, rssi=True, air_speed=LORA_AIR_SPEED, verbose=False, # Use verbose=True to debug init
+            wor=LORA_WOR, wor_period=LORA_WOR_PERIOD
         )
+        if LORA_WOR: node.wor_stats(payload_len=2) # Payload is "1".."10"
         print("[SUCCESS] LoRa Radio Initialized.")
         return True
     except Exception as e: print(f"[FATAL] LoRa Init Failed: {e}"); return False
@@ -90,19 +94,22 @@ def update_display(value):
     print(f"[INFO] Updating display: Value={value}")
     last_received_value = value; img=Image.new('RGB', (CANVAS_WIDTH, CANVAS_HEIGHT), COLOR_WHITE); draw=ImageDraw.Draw(img)
     percentage = value * 10; text = f"{percentage}%"
-    if percent_font: try: bbox=draw.textbbox((CANVAS_WIDTH//2, TEXT_AREA_HEIGHT//2), text, font=percent_font, anchor="mm"); draw.text((bbox[0],bbox[1]), text, font=percent_font, fill=COLOR_BLACK)
-                     except Exception as e: print(f"[ERROR] Text draw error: {e}")
+    if percent_font:
+        try: bbox=draw.textbbox((CANVAS_WIDTH//2, TEXT_AREA_HEIGHT//2), text, font=percent_font, anchor="mm"); draw.text((bbox[0],bbox[1]), text, font=percent_font, fill=COLOR_BLACK)
+        except Exception as e: print(f"[ERROR] Text draw error: {e}")
     for i in range(BAR_COUNT):
         coords=bar_coords[i]; color=bar_colors[i]; bar_idx_bot=BAR_COUNT-1-i; draw.rectangle(coords, outline=COLOR_OUTLINE, width=1)
-        if (bar_idx_bot + 1) <= value: fill_coords=(coords[0]+1, coords[1]+1, coords[2]-1, coords[3]-1);
-        if fill_coords[0] < fill_coords[2] and fill_coords[1] < fill_coords[3]: draw.rectangle(fill_coords, fill=color)
+        if (bar_idx_bot + 1) <= value:
+            fill_coords=(coords[0]+1, coords[1]+1, coords[2]-1, coords[3]-1)
+            if fill_coords[0] < fill_coords[2] and fill_coords[1] < fill_coords[3]: draw.rectangle(fill_coords, fill=color)
     try: rotated_img = img.rotate(90, expand=True); disp.ShowImage(rotated_img); print("[INFO] Display updated.") # +90 rot
     except Exception as e: print(f"[ERROR] Display show error: {e}")
 
 def cleanup():
     print("\n[INFO] Cleaning up...");
-    if disp: try: disp.clear(); disp.bl_DutyCycle(0); disp.module_exit(cleanup=True); print("[INFO] LCD released.")
-             except Exception as e: print(f"[WARN] LCD cleanup error: {e}")
+    if disp:
+        try: disp.clear(); disp.bl_DutyCycle(0); disp.module_exit(cleanup=True); print("[INFO] LCD released.")
+        except Exception as e: print(f"[WARN] LCD cleanup error: {e}")
     # Use close method if defined in lora_driver, else basic GPIO cleanup
     if node and hasattr(node, 'close'):
         try: node.close(); print("[INFO] LoRa released.")
@@ -116,13 +123,13 @@ def main():
     print("--- LoRa Receiver (v6 - Direct sx126x Adapt) ---")
     if not initialize_lora() or not initialize_lcd(): print("[FATAL] Init failed."); cleanup(); sys.exit(1)
     print("-" * 35); print(f"Listening: Addr={RX_NODE_ADDRESS}, Freq={LORA_FREQUENCY}, Speed={LORA_AIR_SPEED}");
-    print("Mode: Fixed (sx126x base), Orientation: Vertical"); print("Press Ctrl+C to exit."); print("-" * 35)
+    print(f"Mode: Fixed (sx126x base), WOR: {f'{LORA_WOR_PERIOD}ms' if LORA_WOR else 'off'}, Orientation: Vertical"); print("Press Ctrl+C to exit."); print("-" * 35)
     print("[INFO] Setting initial display: 9 (90%)"); update_display(9)
 
     while True:
         try:
-            # Use receive method from lora_driver (modified sx126x)
-            payload_bytes, rssi = node.receive()
+            # Use receive method from lora_driver (modified sx126x), blocks until a packet arrives
+            payload_bytes, rssi = node.receive(timeout=None)
 
             if payload_bytes is not None:
                 # This payload should be the number string encoded bytes
@@ -132,12 +139,12 @@ def main():
                     if rssi is not None: print(f" (RSSI: {rssi} dBm)")
                     else: print()
                     try: value = int(payload_str)
-                    if 1 <= value <= 10: update_display(value)
-                    else: print(f"  [WARN] Value {value} out of range.")
                     except ValueError: print(f"  [WARN] Not an integer: '{payload_str}'.")
+                    else:
+                        if 1 <= value <= 10: update_display(value)
+                        else: print(f"  [WARN] Value {value} out of range.")
                 except UnicodeDecodeError: print(f"[WARN] Decode fail. Bytes: {payload_bytes.hex()}")
                 except Exception as e: print(f"[ERROR] Processing error: {e}")
-            time.sleep(0.1)
         except (KeyboardInterrupt, EOFError): print("\n[INFO] Exiting..."); break
         except Exception as e: print(f"\n[ERROR] Loop error: {e}"); logging.exception("Loop:"); break
     cleanup()
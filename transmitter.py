@@ -25,6 +25,8 @@ LORA_POWER = 22
 LORA_AIR_SPEED = 2400
 TX_NODE_ADDRESS = 0 # Address of this transmitter node
 RX_NODE_ADDRESS = 1 # Address of the destination receiver node
+LORA_WOR_TX = True # Send wake-up preambles for receivers idling in WOR mode
+LORA_WOR_PERIOD = 2000 # ms, the transmitter's period must be at least the receiver's
 
 try: # Pre-calculate addresses/offsets
     RX_ADDR_H = (RX_NODE_ADDRESS >> 8) & 0xFF
@@ -61,7 +63,8 @@ def main():
         node = sx126x.sx126x(
             serial_num=LORA_SERIAL_PORT, freq=LORA_FREQUENCY,
             addr=TX_NODE_ADDRESS, power=LORA_POWER, rssi=False, # Tx doesn't need RSSI read
-            air_speed=LORA_AIR_SPEED, verbose=False
+            air_speed=LORA_AIR_SPEED, verbose=False,
+            wor_tx=LORA_WOR_TX, wor_period=LORA_WOR_PERIOD
         )
         if not hasattr(node, 'offset_freq'): raise RuntimeError("Init failed to set offset_freq.")
         print("[SUCCESS] LoRa Radio Initialized.")